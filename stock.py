@@ -5,20 +5,128 @@ A股数据获取命令行工具 - 多功能版本
 """
 
 import click
-import baostock as bs
-import pandas as pd
 from rich.console import Console
-from rich.table import Table
-from rich import box
-
-from rich.panel import Panel
-from rich.columns import Columns
-from rich.text import Text
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import atexit
+import csv
+import functools
+import hashlib
 import os
+import pickle
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+
+# 输出均为手写markup，关闭Rich对每段文本的自动高亮
+console = Console(highlight=False)
+
+def use_plain_output():
+    """统计面板是否改为纯文本输出
+
+    环境变量 BAOSTOCK_PLAIN=1/0 可强制开启/关闭；未设置时，输出不是终端
+    （重定向到文件、管道）则使用纯文本，省去Rich的面板布局。
+    """
+    flag = os.environ.get('BAOSTOCK_PLAIN')
+    if flag in ('0', '1'):
+        return flag == '1'
+    return not console.is_terminal
+
+# 超过该行数的K线表格使用紧凑样式（无斑马纹、无上下留白）
+BIG_TABLE_THRESHOLD = 100
+
+# baostock会话（每个进程只登录一次）
+_session = None
+# 登录失败后本进程不再重试，避免多个查询重复登录、重复输出错误
+_login_failed = False
+# baostock客户端共用一个全局socket，多线程查询时需串行访问
+_bs_lock = threading.Lock()
+# 多个线程可能同时首次登录，登录过程需串行
+_login_lock = threading.Lock()
+
+def ensure_login():
+    """登录baostock系统，同一进程内复用已有会话，登录失败返回None（可在多线程中调用）"""
+    import baostock as bs
+    global _session, _login_failed
+    with _login_lock:
+        if _session is None and not _login_failed:
+            lg = bs.login()
+            if lg.error_code != '0':
+                console.print(f"[red]baostock登录失败: {lg.error_msg}[/red]")
+                _login_failed = True
+                return None
+            _session = lg
+            # 进程退出时统一登出
+            atexit.register(bs.logout)
+    return _session
 
+def first_row_dict(rs):
+    """读取结果集的第一行并转换为 {字段: 值} 字典，查询失败或无数据时返回空字典"""
+    if rs.error_code == '0' and rs.next():
+        return dict(zip(rs.fields, rs.get_row_data()))
+    return {}
 
-console = Console()
+def run_query(query, *args, **kwargs):
+    """在 _bs_lock 保护下执行一次baostock查询，可在多线程中调用"""
+    with _bs_lock:
+        return query(*args, **kwargs)
+
+# K线/指数查询结果的本地缓存目录
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.baostock_cache')
+# 获取时区间尚未结束的K线数据还会更新，缓存1小时；区间结束后获取的数据不过期
+RECENT_CACHE_TTL = 3600
+# 超过该时间未更新的缓存文件会被清理（按天生成的缓存键每天都在变化）
+CACHE_PRUNE_AGE = 30 * 24 * 3600
+_cache_pruned = False
+
+def cache_path(*key_parts):
+    """由查询条件生成缓存文件路径"""
+    key = hashlib.sha1('|'.join(map(str, key_parts)).encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, key + '.pkl')
+
+def load_cache(path, max_age=None):
+    """读取缓存，文件不存在、超过 max_age 秒或已损坏时返回None"""
+    try:
+        if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def prune_cache():
+    """删除 CACHE_DIR 中超过 CACHE_PRUNE_AGE 未更新的文件，每个进程只执行一次"""
+    global _cache_pruned
+    if _cache_pruned:
+        return
+    _cache_pruned = True
+    cutoff = time.time() - CACHE_PRUNE_AGE
+    try:
+        entries = list(os.scandir(CACHE_DIR))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def save_cache(path, value):
+    """写入缓存，写入失败时忽略（只影响下次查询速度）"""
+    prune_cache()
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # 先写临时文件再替换，避免并发读到写了一半的文件
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
 
 # 配置文件相关工具
 def get_config_path(config_path=None):
@@ -35,17 +143,17 @@ def ensure_config_file(config_path):
                 "sh.601398 # 工商银行\n"
             )
 
+# 每行开头的股票代码（跳过空行和 # 注释行）
+_CODE_RE = re.compile(r'^[ \t]*([^\s#]+)', re.M)
+
 def read_stock_codes(config_path):
-    stock_codes = []
+    # 按文件修改时间缓存解析结果，文件变更后自动重新读取
+    return list(_read_stock_codes_cached(config_path, os.stat(config_path).st_mtime_ns))
+
+@functools.lru_cache(maxsize=8)
+def _read_stock_codes_cached(config_path, mtime_ns):
     with open(config_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            code = line.split('#')[0].strip()
-            if code:
-                stock_codes.append(code)
-    return stock_codes
+        return tuple(_CODE_RE.findall(f.read()))
 
 @click.group()
 @click.version_option(version='1.0.0')
@@ -70,8 +178,8 @@ def cli():
     
     支持以下格式：
     • 完整格式: sz.000001 (深交所) / sh.600000 (上交所)
-    • 简写格式: 000001 (0/3开头自动识别为深交所)
-    •          600000 (6开头自动识别为上交所)
+    • 简写格式: 000001 (0/2/3开头自动识别为深交所)
+    •          600000 (6/9开头自动识别为上交所)
     
     ═══════════════════════════════════════════════════════════════
     💡 使用示例
@@ -135,7 +243,8 @@ def cli():
 @click.option('--frequency', '-f', type=click.Choice(['5m', '15m', '30m', '60m', 'd', 'w', 'M']), 
               help='K线周期: 5m=5分钟, 15m=15分钟, 30m=30分钟, 60m=60分钟, d=日线, w=周线, M=月线', default='d')
 @click.option('--export', type=click.Path(), help='导出到CSV文件')
-def kline(stock_code, start, end, days, frequency, export):
+@click.option('--full', is_flag=True, help='查询并导出全部字段（代码、前收盘、换手率、交易状态等）')
+def kline(stock_code, start, end, days, frequency, export, full):
     """
     📈 获取股票K线数据 - 多周期行情分析
     
@@ -157,7 +266,7 @@ def kline(stock_code, start, end, days, frequency, export):
     
     STOCK_CODE: 股票代码 (必需)
       • 支持格式: sz.000001, sh.600000, 000001, 600000
-      • 自动识别: 0/3开头→深交所, 6开头→上交所
+      • 自动识别: 0/2/3开头→深交所, 6/9开头→上交所
     
     --start, -s: 开始日期 (可选)
       • 格式: YYYY-MM-DD (如: 2023-01-01)
@@ -179,9 +288,13 @@ def kline(stock_code, start, end, days, frequency, export):
       • 注意: 分钟线数据仅支持最近几个月的数据
     
     --export: 导出文件路径 (可选)
-      • 格式: CSV文件 (UTF-8编码)
+      • 格式: CSV文件 (UTF-8编码)，以 .gz 结尾时写入gzip压缩的CSV
       • 示例: --export /path/to/data.csv
     
+    --full: 查询全部字段 (可选)
+      • 默认只查询表格和统计用到的字段，导出时加上此参数可获得完整数据
+      • 额外字段: 代码、前收盘价、复权类型、换手率、交易状态、是否ST
+    
     ══════════════════════════════════════════════════════════
     💡 使用示例
     ══════════════════════════════════════════════════════════
@@ -208,6 +321,7 @@ def kline(stock_code, start, end, days, frequency, export):
     数据导出:
       python stock.py kline 000001 --export data.csv           # 导出日线到CSV
       python stock.py kline 000001 -f w --export weekly.csv   # 导出周线数据
+      python stock.py kline 000001 --export full.csv --full   # 导出全部字段
     
     ══════════════════════════════════════════════════════════
     📊 输出说明
@@ -227,6 +341,9 @@ def kline(stock_code, start, end, days, frequency, export):
     • 停牌股票: 停牌期间数据可能不完整
     • 网络连接: 需要稳定网络连接baostock服务器
     """
+    from rich.table import Table
+    from rich import box
+    
     # 验证和格式化股票代码
     if not stock_code or not stock_code.strip():
         console.print("[red]❌ 错误: 请提供股票代码[/red]")
@@ -241,204 +358,156 @@ def kline(stock_code, start, end, days, frequency, export):
     
     # 如果没有指定开始和结束日期，使用days参数
     if not start and not end:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        start = start_date.strftime('%Y-%m-%d')
-        end = end_date.strftime('%Y-%m-%d')
+        end_date = date.today()
+        start = (end_date - timedelta(days=days)).isoformat()
+        end = end_date.isoformat()
     elif not start:
-        start = (datetime.strptime(end, '%Y-%m-%d') - timedelta(days=days)).strftime('%Y-%m-%d')
+        start = (date.fromisoformat(end) - timedelta(days=days)).isoformat()
     elif not end:
-        end = datetime.now().strftime('%Y-%m-%d')
-    
-    # 频率映射和描述
-    frequency_map = {
-        '5m': ('5', '5分钟'),
-        '15m': ('15', '15分钟'), 
-        '30m': ('30', '30分钟'),
-        '60m': ('60', '60分钟'),
-        'd': ('d', '日线'),
-        'w': ('w', '周线'),
-        'M': ('M', '月线')
-    }
+        end = date.today().isoformat()
     
-    bao_frequency, freq_desc = frequency_map[frequency]
-    console.print(f"[blue]📈 正在获取 {stock_code} 从 {start} 到 {end} 的{freq_desc}数据...[/blue]")
+    spec = KLINE_SPECS[frequency]
+    console.print(f"[blue]📈 正在获取 {stock_code} 从 {start} 到 {end} 的{spec.desc}数据...[/blue]")
     
-    # 登录baostock系统
-    lg = bs.login()
-    if lg.error_code != '0':
-        console.print(f"[red]baostock登录失败: {lg.error_msg}[/red]")
+    columns, error_msg = fetch_kline(stock_code, start, end, frequency, full)
+    if columns is None:
+        if error_msg:
+            console.print(f"[red]数据获取失败: {error_msg}[/red]")
         return
     
-    try:
-        # 根据频率选择不同的查询方法和字段
-        if frequency in ['5m', '15m', '30m', '60m']:
-            # 分钟线数据查询
-            rs = bs.query_history_k_data_plus(
-                stock_code,
-                "date,time,code,open,high,low,close,volume,amount,adjustflag",
-                start_date=start,
-                end_date=end,
-                frequency=bao_frequency,
-                adjustflag="3"
-            )
-        elif frequency in ['w', 'M']:
-            # 周线/月线数据查询（字段限制）
-            rs = bs.query_history_k_data_plus(
-                stock_code,
-                "date,code,open,high,low,close,volume,amount,adjustflag",
-                start_date=start,
-                end_date=end,
-                frequency=bao_frequency,
-                adjustflag="3"
-            )
-        else:
-            # 日线数据查询
+    if len(columns['date']) == 0:
+        console.print(f"[yellow]未找到 {stock_code} 在指定日期范围内的数据[/yellow]")
+        return
+    
+    # 创建Rich表格（大表格使用紧凑样式以减少渲染开销）
+    big_table = len(columns['date']) > BIG_TABLE_THRESHOLD
+    table = Table(
+        title=f"📈 {stock_code} {spec.desc}数据 ({start} ~ {end})",
+        box=box.ROUNDED,
+        show_header=True,
+        header_style="bold magenta",
+        row_styles=None if big_table else ["", "on grey11"],
+        padding=(0, 1) if big_table else (1, 1)
+    )
+    
+    # 按周期定义添加表格列和数据行（按列批量格式化，避免逐行iterrows）
+    for header, style, justify in spec.table_columns:
+        table.add_column(header, style=style, justify=justify)
+    rows = spec.row_fn(columns)
+    for values in rows:
+        table.add_row(*values)
+    
+    console.print(table)
+    
+    # 显示统计信息 (简化版)
+    display_kline_stats(columns, frequency)
+    
+    # 导出数据
+    if export:
+        export_columns_csv(columns, export)
+        console.print(f"\n[green]✅ 数据已导出到: {export}[/green]")
+    
+    # 显示股票链接
+    display_stock_link(stock_code)
+    
+def kline_rows(columns):
+    """生成分钟线/周线/月线的表格行：日期、OHLC、成交量、成交额"""
+    date_col = columns['datetime'] if 'datetime' in columns else columns['date']
+    price_cols = [format_price_column(columns[col]) for col in ('open', 'high', 'low', 'close')]
+    return zip(date_col, *price_cols, format_volume_column(columns['volume']), format_amount_column(columns['amount']))
+
+def daily_kline_rows(columns):
+    """生成日线的表格行：在OHLC之后增加涨跌幅列"""
+    price_cols = [format_price_column(columns[col]) for col in ('open', 'high', 'low', 'close')]
+    return zip(columns['date'], *price_cols, format_pct_column(columns['pctChg']),
+               format_volume_column(columns['volume']), format_amount_column(columns['amount']))
+
+@dataclass(frozen=True)
+class KlineSpec:
+    """单个K线周期的查询字段、数值列和表格定义"""
+    bao_frequency: str
+    desc: str
+    fields: str  # 表格和统计用到的字段
+    full_fields: str  # --full 时查询的全部字段
+    numeric: tuple
+    table_columns: tuple  # (列标题, 样式, 对齐方式)
+    row_fn: Callable
+    bars_per_day: float  # 每个自然日的K线数上限，用于预估行数
+
+# 分钟线/周线/月线与日线的字段、数值列和表格列
+_MINUTE_FIELDS = "date,time,open,high,low,close,volume,amount"
+_PERIOD_FIELDS = "date,open,high,low,close,volume,amount"
+_DAILY_FIELDS = "date,open,high,low,close,volume,amount,pctChg"
+_MINUTE_FULL_FIELDS = "date,time,code,open,high,low,close,volume,amount,adjustflag"
+_PERIOD_FULL_FIELDS = "date,code,open,high,low,close,volume,amount,adjustflag"
+_DAILY_FULL_FIELDS = "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST"
+_BASIC_NUMERIC = ('open', 'high', 'low', 'close', 'volume', 'amount')
+_DAILY_NUMERIC = ('open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg')
+_PRICE_COLUMNS = (("开盘", "white", "right"), ("最高", "white", "right"), ("最低", "white", "right"), ("收盘", "white", "right"))
+_TRADE_COLUMNS = (("成交量", "blue", "right"), ("成交额", "blue", "right"))
+_MINUTE_COLUMNS = (("日期时间", "cyan", "center"),) + _PRICE_COLUMNS + _TRADE_COLUMNS
+_PERIOD_COLUMNS = (("日期", "cyan", "center"),) + _PRICE_COLUMNS + _TRADE_COLUMNS
+_DAILY_COLUMNS = (("日期", "cyan", "center"),) + _PRICE_COLUMNS + (("涨跌幅", "white", "right"),) + _TRADE_COLUMNS
+
+# K线周期 -> 周期定义
+KLINE_SPECS = {
+    '5m': KlineSpec('5', '5分钟', _MINUTE_FIELDS, _MINUTE_FULL_FIELDS, _BASIC_NUMERIC, _MINUTE_COLUMNS, kline_rows, 48),
+    '15m': KlineSpec('15', '15分钟', _MINUTE_FIELDS, _MINUTE_FULL_FIELDS, _BASIC_NUMERIC, _MINUTE_COLUMNS, kline_rows, 16),
+    '30m': KlineSpec('30', '30分钟', _MINUTE_FIELDS, _MINUTE_FULL_FIELDS, _BASIC_NUMERIC, _MINUTE_COLUMNS, kline_rows, 8),
+    '60m': KlineSpec('60', '60分钟', _MINUTE_FIELDS, _MINUTE_FULL_FIELDS, _BASIC_NUMERIC, _MINUTE_COLUMNS, kline_rows, 4),
+    'd': KlineSpec('d', '日线', _DAILY_FIELDS, _DAILY_FULL_FIELDS, _DAILY_NUMERIC, _DAILY_COLUMNS, daily_kline_rows, 1),
+    'w': KlineSpec('w', '周线', _PERIOD_FIELDS, _PERIOD_FULL_FIELDS, _BASIC_NUMERIC, _PERIOD_COLUMNS, kline_rows, 1 / 7),
+    'M': KlineSpec('M', '月线', _PERIOD_FIELDS, _PERIOD_FULL_FIELDS, _BASIC_NUMERIC, _PERIOD_COLUMNS, kline_rows, 1 / 28),
+}
+
+def fetch_kline(stock_code, start, end, frequency, full=False):
+    """查询K线数据，返回 (按列数组字典, 错误信息)，成功时错误信息为None
+
+    默认只查询显示用到的字段，full=True 时查询全部字段；结果缓存在 CACHE_DIR 中，
+    缓存未命中时才登录。登录失败时返回 (None, None)，错误已由 ensure_login 输出。
+
+    可在多个线程中并发调用，baostock查询本身通过 _bs_lock 串行执行。
+    """
+    import baostock as bs
+    import numpy as np
+    spec = KLINE_SPECS[frequency]
+    fields = spec.full_fields if full else spec.fields
+    
+    # 相同查询条件的结果优先从本地缓存读取，缓存内容为 (获取时间, 按列数组)：
+    # 在结束日期之后获取的数据已完整，长期有效；否则只在 RECENT_CACHE_TTL 内有效
+    cache_file = cache_path('kline', stock_code, start, end, frequency, fields)
+    cached = load_cache(cache_file)
+    columns = None
+    if isinstance(cached, tuple):
+        fetched_at, cached_columns = cached
+        if date.fromtimestamp(fetched_at).isoformat() > end or time.time() - fetched_at < RECENT_CACHE_TTL:
+            columns = cached_columns
+    if columns is None:
+        # 复用当前进程的baostock会话
+        if not ensure_login():
+            return None, None
+        with _bs_lock:
             rs = bs.query_history_k_data_plus(
                 stock_code,
-                "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST",
+                fields,
                 start_date=start,
                 end_date=end,
-                frequency=bao_frequency,
+                frequency=spec.bao_frequency,
                 adjustflag="3"
             )
-        
-        if rs.error_code != '0':
-            console.print(f"[red]数据获取失败: {rs.error_msg}[/red]")
-            return
-        
-        # 将数据转换为DataFrame
-        data_list = []
-        while (rs.error_code == '0') & rs.next():
-            data_list.append(rs.get_row_data())
-        
-        if not data_list:
-            console.print(f"[yellow]未找到 {stock_code} 在指定日期范围内的数据[/yellow]")
-            return
-        
-        df = pd.DataFrame(data_list, columns=rs.fields)
-        
-        # 根据频率类型进行不同的数据处理
-        if frequency in ['5m', '15m', '30m', '60m']:
-            # 分钟线数据类型转换
-            numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'amount']
-            for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            # 合并日期时间列
-            if 'time' in df.columns:
-                df['datetime'] = df['date'] + ' ' + df['time']
-        elif frequency in ['w', 'M']:
-            # 周线/月线数据类型转换
-            numeric_columns = ['open', 'high', 'low', 'close', 'volume', 'amount']
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-        else:
-            # 日线数据类型转换
-            numeric_columns = ['open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg']
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-        
-        # 创建Rich表格
-        table = Table(
-            title=f"📈 {stock_code} {freq_desc}数据 ({start} ~ {end})",
-            box=box.ROUNDED,
-            show_header=True,
-            header_style="bold magenta",
-            row_styles=["", "on grey11"],
-            padding=(1, 1)
-        )
-        
-        # 根据频率类型添加不同的列
-        if frequency in ['5m', '15m', '30m', '60m']:
-            # 分钟线表格列
-            table.add_column("日期时间", style="cyan", justify="center")
-            table.add_column("开盘", style="white", justify="right")
-            table.add_column("最高", style="white", justify="right")
-            table.add_column("最低", style="white", justify="right")
-            table.add_column("收盘", style="white", justify="right")
-            table.add_column("成交量", style="blue", justify="right")
-            table.add_column("成交额", style="blue", justify="right")
-        elif frequency in ['w', 'M']:
-            # 周线/月线表格列（不显示涨跌幅）
-            table.add_column("日期", style="cyan", justify="center")
-            table.add_column("开盘", style="white", justify="right")
-            table.add_column("最高", style="white", justify="right")
-            table.add_column("最低", style="white", justify="right")
-            table.add_column("收盘", style="white", justify="right")
-            table.add_column("成交量", style="blue", justify="right")
-            table.add_column("成交额", style="blue", justify="right")
-        else:
-            # 日线表格列
-            table.add_column("日期", style="cyan", justify="center")
-            table.add_column("开盘", style="white", justify="right")
-            table.add_column("最高", style="white", justify="right")
-            table.add_column("最低", style="white", justify="right")
-            table.add_column("收盘", style="white", justify="right")
-            table.add_column("涨跌幅", style="white", justify="right")
-            table.add_column("成交量", style="blue", justify="right")
-            table.add_column("成交额", style="blue", justify="right")
-        
-        # 添加数据行
-        for _, row in df.iterrows():
-            # 格式化成交量和成交额
-            volume = int(row['volume']) if pd.notna(row['volume']) else 0
-            amount = float(row['amount']) if pd.notna(row['amount']) else 0
-            volume_str = f"{volume:,}" if volume > 0 else "-"
-            amount_str = f"{amount/100000000:.2f}亿" if amount > 100000000 else f"{amount/10000:.2f}万" if amount > 10000 else f"{amount:.0f}"
-
-            if frequency in ['5m', '15m', '30m', '60m']:
-                table.add_row(
-                    row['datetime'] if 'datetime' in row else row['date'],
-                    f"{float(row['open']):.2f}" if pd.notna(row['open']) else "-",
-                    f"{float(row['high']):.2f}" if pd.notna(row['high']) else "-",
-                    f"{float(row['low']):.2f}" if pd.notna(row['low']) else "-",
-                    f"{float(row['close']):.2f}" if pd.notna(row['close']) else "-",
-                    volume_str,
-                    amount_str
-                )
-            elif frequency in ['w', 'M']:
-                table.add_row(
-                    row['date'],
-                    f"{float(row['open']):.2f}" if pd.notna(row['open']) else "-",
-                    f"{float(row['high']):.2f}" if pd.notna(row['high']) else "-",
-                    f"{float(row['low']):.2f}" if pd.notna(row['low']) else "-",
-                    f"{float(row['close']):.2f}" if pd.notna(row['close']) else "-",
-                    volume_str,
-                    amount_str
-                )
-            else:
-                pct_change = float(row['pctChg']) if pd.notna(row['pctChg']) else 0
-                pct_style = "red" if pct_change > 0 else "green" if pct_change < 0 else "white"
-                pct_text = f"{pct_change:+.2f}%" if pct_change != 0 else "0.00%"
-                table.add_row(
-                    row['date'],
-                    f"{float(row['open']):.2f}" if pd.notna(row['open']) else "-",
-                    f"{float(row['high']):.2f}" if pd.notna(row['high']) else "-",
-                    f"{float(row['low']):.2f}" if pd.notna(row['low']) else "-",
-                    f"{float(row['close']):.2f}" if pd.notna(row['close']) else "-",
-                    f"[{pct_style}]{pct_text}[/{pct_style}]",
-                    volume_str,
-                    amount_str
-                )
-        
-        console.print(table)
-        
-        # 显示统计信息 (简化版)
-        display_kline_stats(df, frequency)
-        
-        # 导出数据
-        if export:
-            df.to_csv(export, index=False, encoding='utf-8-sig')
-            console.print(f"\n[green]✅ 数据已导出到: {export}[/green]")
-        
-        # 显示股票链接
-        display_stock_link(stock_code)
-    
-    finally:
-        # 登出baostock系统
-        bs.logout()
+            if rs.error_code != '0':
+                return None, rs.error_msg
+            # 持锁期间只把结果页取到本地，解析放到释放锁之后，其他线程的查询可同时进行
+            pages = list(iter_result_pages(rs))
+        columns = pages_to_columns(rs.fields, pages, spec.numeric, estimate_kline_rows(start, end, frequency))
+        # 空结果可能只是数据尚未更新，不缓存
+        if len(columns['date']) > 0:
+            save_cache(cache_file, (time.time(), columns))
+    
+    if 'time' in columns:
+        # 合并日期时间列
+        columns['datetime'] = np.array([f"{d} {t}" for d, t in zip(columns['date'], columns['time'])], dtype=object)
+    return columns, None
     
 @cli.command()
 @click.argument('stock_code', type=str, required=True)
@@ -462,7 +531,7 @@ def info(stock_code):
     
     STOCK_CODE: 股票代码 (必需)
       • 支持格式: sz.000001, sh.600000, 000001, 600000  
-      • 自动识别: 0/3开头→深交所, 6开头→上交所
+      • 自动识别: 0/2/3开头→深交所, 6/9开头→上交所
     
     ══════════════════════════════════════════════════════════
     💡 使用示例
@@ -502,57 +571,68 @@ def info(stock_code):
     • 退市股票: 显示退市日期，基本信息可能不完整
     • 新股上市: 上市首日后1-2个工作日可查询到信息
     """
+    from rich.table import Table
+    from rich import box
+    
     stock_code = format_stock_code(stock_code.strip())
     if not stock_code:
         return
     
     console.print(f"[blue]📋 正在获取 {stock_code} 的基本信息...[/blue]")
     
-    # 登录baostock
-    lg = bs.login()
-    if lg.error_code != '0':
-        console.print(f"[red]baostock登录失败: {lg.error_msg}[/red]")
+    # 优先读本地缓存，未命中时才登录并查询
+    info_data, error_msg = fetch_basic_data(stock_code)
+    if info_data is None:
+        if error_msg:
+            console.print(f"[red]获取股票信息失败: {error_msg}[/red]")
         return
     
-    try:
-        # 获取股票基本信息
-        rs = bs.query_stock_basic(code=stock_code)
-        if rs.error_code != '0':
-            console.print(f"[red]获取股票信息失败: {rs.error_msg}[/red]")
-            return
-            
-        data_list = []
-        while (rs.error_code == '0') & rs.next():
-            data_list.append(rs.get_row_data())
+    if info_data:
+        # 创建信息表格
+        table = Table(title=f"📋 {stock_code} 基本信息", box=box.ROUNDED, padding=(1, 1))
+        table.add_column("项目", style="cyan", width=12)
+        table.add_column("内容", style="white")
         
-        if data_list:
-            info_data = dict(zip(rs.fields, data_list[0]))
-            
-            # 创建信息表格
-            table = Table(title=f"📋 {stock_code} 基本信息", box=box.ROUNDED, padding=(1, 1))
-            table.add_column("项目", style="cyan", width=12)
-            table.add_column("内容", style="white")
-            
-            table.add_row("股票代码", info_data.get('code', '-'))
-            table.add_row("股票名称", info_data.get('code_name', '-'))
-            table.add_row("上市日期", info_data.get('ipoDate', '-'))
-            table.add_row("退市日期", info_data.get('outDate', '-') or '[green]正常交易[/green]')
-            table.add_row("股票类型", get_stock_type_desc(info_data.get('type', '-')))
-            table.add_row("交易状态", get_status_desc(info_data.get('status', '-')))
-            
-            console.print(table)
-            
-            # 获取行业信息
-            get_industry_info(stock_code)
-            
-            # 显示股票链接
-            display_stock_link(stock_code)
-            
-        else:
-            console.print(f"[yellow]未找到 {stock_code} 的基本信息[/yellow]")
-            
-    finally:
-        bs.logout()
+        table.add_row("股票代码", info_data.get('code', '-'))
+        table.add_row("股票名称", info_data.get('code_name', '-'))
+        table.add_row("上市日期", info_data.get('ipoDate', '-'))
+        table.add_row("退市日期", info_data.get('outDate', '-') or '[green]正常交易[/green]')
+        table.add_row("股票类型", get_stock_type_desc(info_data.get('type', '-')))
+        table.add_row("交易状态", get_status_desc(info_data.get('status', '-')))
+        
+        console.print(table)
+        
+        # 显示行业信息（获取失败不影响主要功能）
+        get_industry_info(stock_code)
+        
+        # 显示股票链接
+        display_stock_link(stock_code)
+        
+    else:
+        console.print(f"[yellow]未找到 {stock_code} 的基本信息[/yellow]")
+
+def fetch_basic_data(stock_code):
+    """获取股票基本信息，返回 (信息字典, 错误信息)
+
+    当天查询过的结果直接读本地缓存；登录失败时返回 (None, None)，错误已由 ensure_login 输出。
+    """
+    import baostock as bs
+    cache_file = cache_path('basic', stock_code, date.today().isoformat())
+    info_data = load_cache(cache_file)
+    if info_data is not None:
+        return info_data, None
+    
+    # 复用当前进程的baostock会话
+    if not ensure_login():
+        return None, None
+    # 获取股票基本信息（只需要第一行）
+    rs = run_query(bs.query_stock_basic, code=stock_code)
+    if rs.error_code != '0':
+        return None, rs.error_msg
+    info_data = first_row_dict(rs)
+    if info_data:
+        save_cache(cache_file, info_data)
+    return info_data, None
 
 def get_stock_type_desc(type_code):
     """获取股票类型描述"""
@@ -571,28 +651,43 @@ def get_status_desc(status_code):
     }
     return status_map.get(status_code, status_code or '-')
 
+# 行业分类更新不频繁，查询结果按股票代码缓存到本地，30天内直接复用
+INDUSTRY_CACHE_TTL = 30 * 24 * 3600
+
+def fetch_industry_data(stock_code):
+    """获取行业信息字典，优先使用未过期的本地缓存"""
+    import baostock as bs
+    cache_file = cache_path('industry', stock_code)
+    industry_data = load_cache(cache_file, INDUSTRY_CACHE_TTL)
+    if industry_data is not None:
+        return industry_data
+    
+    # 复用当前进程的baostock会话
+    if not ensure_login():
+        return {}
+    industry_data = first_row_dict(run_query(bs.query_stock_industry, code=stock_code))
+    if industry_data:
+        save_cache(cache_file, industry_data)
+    return industry_data
+
 def get_industry_info(stock_code):
-    """获取行业信息"""
+    """获取并显示行业信息"""
+    from rich.table import Table
+    from rich import box
+    
     try:
-        rs = bs.query_stock_industry(code=stock_code)
-        if rs.error_code == '0':
-            data_list = []
-            while (rs.error_code == '0') & rs.next():
-                data_list.append(rs.get_row_data())
+        industry_data = fetch_industry_data(stock_code)
+        if industry_data:
+            # 创建行业信息表格
+            table = Table(title=f"🏢 行业信息", box=box.ROUNDED, padding=(1, 1))
+            table.add_column("项目", style="cyan", width=12)
+            table.add_column("内容", style="white")
             
-            if data_list:
-                industry_data = dict(zip(rs.fields, data_list[0]))
-                
-                # 创建行业信息表格
-                table = Table(title=f"🏢 行业信息", box=box.ROUNDED, padding=(1, 1))
-                table.add_column("项目", style="cyan", width=12)
-                table.add_column("内容", style="white")
-                
-                table.add_row("所属行业", industry_data.get('industry', '-'))
-                table.add_row("行业分类", industry_data.get('industryClassification', '-'))
-                
-                console.print("\n")
-                console.print(table)
+            table.add_row("所属行业", industry_data.get('industry', '-'))
+            table.add_row("行业分类", industry_data.get('industryClassification', '-'))
+            
+            console.print("\n")
+            console.print(table)
     except Exception as e:
         # 行业信息获取失败不影响主要功能
         pass
@@ -619,9 +714,9 @@ def realtime(stock_codes):
     
     STOCK_CODES: 股票代码列表 (支持多个)
       • 支持格式: sz.000001, sh.600000, 000001, 600000
-      • 自动识别: 0/3开头→深交所, 6开头→上交所
+      • 自动识别: 0/2/3开头→深交所, 6/9开头→上交所
       • 批量查询: 空格分隔多个股票代码
-      • 数量限制: 建议单次查询不超过20只股票
+      • 合并请求: 每80只股票合并为一次行情请求
     
     ══════════════════════════════════════════════════════════
     💡 使用示例
@@ -687,31 +782,98 @@ def realtime(stock_codes):
     ⚠️  注意事项
     ══════════════════════════════════════════════════════════
     
-    • 🚧 功能状态: 当前为演示版本，显示模拟数据
-    • 🔌 数据源: 需要接入实时行情数据接口 (如新浪、腾讯等)
-    • 💰 费用说明: 实时数据可能需要付费订阅
+    • 🔌 数据源: 新浪财经行情接口 (hq.sinajs.cn)，需要网络连接
     • 📊 延迟说明: 免费数据通常有3-15分钟延迟
     • 🏷️  免责声明: 数据仅供参考，投资决策请谨慎
     • 🔒 使用限制: 请遵守数据提供商的使用条款
     """
+    from rich.table import Table
+    from rich import box
+    
+    stock_codes = format_stock_codes(stock_codes)
+    if not stock_codes:
+        return
+    
     console.print(f"[blue]获取实时行情数据...[/blue]")
+    try:
+        quotes = fetch_realtime_quotes(stock_codes)
+    except OSError as e:
+        console.print(f"[red]实时行情获取失败: {e}[/red]")
+        return
     
     # 创建实时行情表格
     table = Table(title="⚡ 实时行情", box=box.ROUNDED)
     table.add_column("股票代码", style="cyan")
     table.add_column("股票名称", style="white")
-    table.add_column("现价", style="white")
-    table.add_column("涨跌", style="white")
-    table.add_column("涨跌幅", style="white")
-    
-    for code in stock_codes:
-        formatted_code = format_stock_code(code)
-        if formatted_code:
-            # 这里可以添加实时数据获取逻辑
-            table.add_row(formatted_code, "示例股票", "10.00", "+0.50", "+5.26%")
+    table.add_column("现价", style="white", justify="right")
+    table.add_column("涨跌", style="white", justify="right")
+    table.add_column("涨跌幅", style="white", justify="right")
+    
+    rows = []
+    for stock_code in stock_codes:
+        if stock_code not in quotes:
+            console.print(f"[yellow]未找到 {stock_code} 的实时行情[/yellow]")
+            continue
+        name, price, preclose = quotes[stock_code]
+        # 停牌或开盘前现价为0，此时不计算涨跌
+        if price > 0 and preclose > 0:
+            change = price - preclose
+            pct = change / preclose * 100
+        else:
+            change = pct = float('nan')
+        rows.append((stock_code, name, price, change, pct))
+    
+    # 按涨跌幅从高到低排序，无涨跌数据的排在最后
+    rows.sort(key=lambda row: row[4] if row[4] == row[4] else float('-inf'), reverse=True)
+    for stock_code, name, price, change, pct in rows:
+        if pct != pct:
+            table.add_row(stock_code, name, f"{price:.2f}" if price > 0 else "-", "-", "-")
+            continue
+        style = "red" if change > 0 else "green" if change < 0 else "white"
+        table.add_row(stock_code, name, f"{price:.2f}",
+                      f"[{style}]{change:+.2f}[/{style}]", f"[{style}]{pct:+.2f}%[/{style}]")
     
     console.print(table)
-    console.print("[yellow]注: 实时数据功能需要接入实时数据源[/yellow]")
+    console.print(f"[dim]数据来源: 新浪财经  获取时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}[/dim]")
+
+# 新浪行情接口，一次请求可以带多只股票代码（逗号分隔）
+SINA_QUOTE_URL = 'https://hq.sinajs.cn/list='
+SINA_BATCH_SIZE = 80
+SINA_MAX_WORKERS = 8
+# 返回格式: var hq_str_sh600000="名称,今开,昨收,现价,最高,最低,...";
+_SINA_QUOTE_RE = re.compile(r'hq_str_(\w+)="([^"]*)"')
+
+def fetch_sina_batch(stock_codes, timeout=10):
+    """请求一批（不超过 SINA_BATCH_SIZE 只）股票的新浪实时报价"""
+    from urllib.request import Request, urlopen
+    url = SINA_QUOTE_URL + ','.join(code.replace('.', '') for code in stock_codes)
+    request = Request(url, headers={'Referer': 'https://finance.sina.com.cn'})
+    with urlopen(request, timeout=timeout) as response:
+        text = response.read().decode('gbk', errors='replace')
+    quotes = {}
+    for sina_code, payload in _SINA_QUOTE_RE.findall(text):
+        parts = payload.split(',')
+        if len(parts) < 4:
+            continue
+        quotes[f"{sina_code[:2]}.{sina_code[2:]}"] = (parts[0], parse_float(parts[3]), parse_float(parts[2]))
+    return quotes
+
+def fetch_realtime_quotes(stock_codes, timeout=10):
+    """从新浪行情接口批量获取实时报价，返回 {股票代码: (名称, 现价, 昨收)}
+
+    每 SINA_BATCH_SIZE 只股票合并为一次请求，多批请求并发发出；
+    没有返回数据的代码不在结果中，网络错误以 OSError 抛出。
+    """
+    chunks = [stock_codes[i:i + SINA_BATCH_SIZE] for i in range(0, len(stock_codes), SINA_BATCH_SIZE)]
+    if len(chunks) <= 1:
+        return fetch_sina_batch(chunks[0], timeout) if chunks else {}
+    
+    # 新浪接口是无状态HTTP请求，各批之间互不依赖，可直接并发
+    quotes = {}
+    with ThreadPoolExecutor(max_workers=min(len(chunks), SINA_MAX_WORKERS)) as executor:
+        for batch in executor.map(lambda chunk: fetch_sina_batch(chunk, timeout), chunks):
+            quotes.update(batch)
+    return quotes
 
 @cli.command()
 @click.argument('stock_code', type=str, required=True)
@@ -737,7 +899,7 @@ def finance(stock_code, year, quarter):
     
     STOCK_CODE: 股票代码 (必需)
       • 支持格式: sz.000001, sh.600000, 000001, 600000
-      • 自动识别: 0/3开头→深交所, 6开头→上交所
+      • 自动识别: 0/2/3开头→深交所, 6/9开头→上交所
     
     --year, -y: 查询年份 (可选)
       • 格式: YYYY (如: 2023)
@@ -811,89 +973,49 @@ def finance(stock_code, year, quarter):
     • 单位说明: 金额自动转换为万元/亿元显示
     • 历史数据: 支持查询2007年以来的财务数据
     """
+    import baostock as bs
     stock_code = format_stock_code(stock_code.strip())
     if not stock_code:
         return
     
     # 设置默认查询时间
     if not year:
-        year = str(datetime.now().year - 1)  # 默认查询去年数据，因为当年数据可能还未发布
+        year = str(date.today().year - 1)  # 默认查询去年数据，因为当年数据可能还未发布
     if not quarter:
         quarter = 4
     
     console.print(f"[blue]💰 正在获取 {stock_code} 的财务数据 ({year}Q{quarter})...[/blue]")
     
     # 登录baostock
-    lg = bs.login()
-    if lg.error_code != '0':
-        console.print(f"[red]baostock登录失败: {lg.error_msg}[/red]")
+    if not ensure_login():
         return
     
-    try:
-        # 获取季度利润表数据
-        rs_profit = bs.query_profit_data(code=stock_code, year=year, quarter=quarter)
-        
-        # 获取季度现金流量表数据
-        rs_cash = bs.query_cash_flow_data(code=stock_code, year=year, quarter=quarter)
-        
-        # 获取季度资产负债表数据
-        rs_balance = bs.query_balance_data(code=stock_code, year=year, quarter=quarter)
-        
-        # 处理利润表数据
-        profit_data = {}
-        if rs_profit.error_code == '0':
-            while (rs_profit.error_code == '0') & rs_profit.next():
-                row_data = rs_profit.get_row_data()
-                profit_data = dict(zip(rs_profit.fields, row_data))
-                break
-        
-        # 处理现金流数据
-        cash_data = {}
-        if rs_cash.error_code == '0':
-            while (rs_cash.error_code == '0') & rs_cash.next():
-                row_data = rs_cash.get_row_data()
-                cash_data = dict(zip(rs_cash.fields, row_data))
-                break
-        
-        # 处理资产负债表数据
-        balance_data = {}
-        if rs_balance.error_code == '0':
-            while (rs_balance.error_code == '0') & rs_balance.next():
-                row_data = rs_balance.get_row_data()
-                balance_data = dict(zip(rs_balance.fields, row_data))
-                break
-        
-        if not any([profit_data, cash_data, balance_data]):
-            console.print(f"[yellow]未找到 {stock_code} 在 {year}Q{quarter} 的财务数据[/yellow]")
-            console.print("[dim]提示: 尝试查询其他年份或季度[/dim]")
-            return
-        
-        # 创建财务数据表格
-        display_finance_data(stock_code, year, quarter, profit_data, cash_data, balance_data)
-        
-        # 显示股票链接
-        display_stock_link(stock_code)
-        
-    finally:
-        bs.logout()
+    # 依次查询利润表、现金流量表、资产负债表，各自读取首行数据
+    # （baostock所有请求共用一个全局socket，并发提交也只能串行执行）
+    query_args = dict(code=stock_code, year=year, quarter=quarter)
+    profit_data = first_row_dict(bs.query_profit_data(**query_args))
+    cash_data = first_row_dict(bs.query_cash_flow_data(**query_args))
+    balance_data = first_row_dict(bs.query_balance_data(**query_args))
+    
+    if not any([profit_data, cash_data, balance_data]):
+        console.print(f"[yellow]未找到 {stock_code} 在 {year}Q{quarter} 的财务数据[/yellow]")
+        console.print("[dim]提示: 尝试查询其他年份或季度[/dim]")
+        return
+    
+    # 创建财务数据表格
+    display_finance_data(stock_code, year, quarter, profit_data, cash_data, balance_data)
+    
+    # 显示股票链接
+    display_stock_link(stock_code)
 
 def display_finance_data(stock_code, year, quarter, profit_data, cash_data, balance_data):
     """显示财务数据"""
+    from rich.console import Group
+    from rich.table import Table
+    from rich import box
     
-    def format_amount(value_str):
-        """格式化金额显示"""
-        try:
-            if not value_str or value_str == '' or value_str == 'None':
-                return '-'
-            value = float(value_str)
-            if abs(value) >= 100000000:  # 亿
-                return f"{value/100000000:.2f}亿"
-            elif abs(value) >= 10000:  # 万
-                return f"{value/10000:.2f}万"
-            else:
-                return f"{value:.0f}"
-        except:
-            return value_str or '-'
+    # 各报表收集后一次输出
+    renderables = []
     
     # 利润表数据
     if profit_data:
@@ -908,7 +1030,7 @@ def display_finance_data(stock_code, year, quarter, profit_data, cash_data, bala
         table1.add_row("净利润", format_amount(profit_data.get('netProfit', '')))
         table1.add_row("每股收益", format_amount(profit_data.get('basicEarningsPerShare', '')))
         
-        console.print(table1)
+        renderables.append(table1)
     
     # 资产负债表数据
     if balance_data:
@@ -922,8 +1044,7 @@ def display_finance_data(stock_code, year, quarter, profit_data, cash_data, bala
         table2.add_row("流动资产", format_amount(balance_data.get('totalCurrentAssets', '')))
         table2.add_row("流动负债", format_amount(balance_data.get('totalCurrentLiabilities', '')))
         
-        console.print("\n")
-        console.print(table2)
+        renderables += ["\n", table2]
     
     # 现金流量表数据
     if cash_data:
@@ -936,52 +1057,239 @@ def display_finance_data(stock_code, year, quarter, profit_data, cash_data, bala
         table3.add_row("筹资现金流", format_amount(cash_data.get('financingCashFlow', '')))
         table3.add_row("现金净增加", format_amount(cash_data.get('netIncreaseInCash', '')))
         
-        console.print("\n")
-        console.print(table3)
+        renderables += ["\n", table3]
+    
+    if renderables:
+        console.print(Group(*renderables))
+
+# 股票代码首位数字 -> 交易所前缀
+_EXCHANGE_PREFIX = {'0': 'sz.', '2': 'sz.', '3': 'sz.', '6': 'sh.', '9': 'sh.'}
+# 已带交易所前缀的完整格式
+_FULL_CODE_PREFIXES = frozenset(_EXCHANGE_PREFIX.values())
+
+@functools.lru_cache(maxsize=4096)
+def normalize_stock_code(stock_code):
+    """将股票代码转换为 sz./sh. 完整格式，无法识别时返回None（不输出提示，结果可缓存）"""
+    stock_code = stock_code.strip().lower()
+    if stock_code[:3] in _FULL_CODE_PREFIXES:
+        return stock_code
+    # 按首位数字查表确定交易所前缀
+    prefix = _EXCHANGE_PREFIX.get(stock_code[:1])
+    return prefix + stock_code if prefix else None
 
 def format_stock_code(stock_code):
-    """格式化股票代码"""
+    """格式化股票代码，无法识别时输出提示并返回None"""
     if not stock_code or not stock_code.strip():
         console.print("[red]❌ 错误: 股票代码不能为空[/red]")
         return None
     
-    stock_code = stock_code.strip()
-    
-    if not stock_code.startswith(('sz.', 'sh.')):
-        if stock_code.startswith('0') or stock_code.startswith('3'):
-            stock_code = f'sz.{stock_code}'
-        elif stock_code.startswith('6'):
-            stock_code = f'sh.{stock_code}'
-        else:
-            console.print(f"[red]❌ 错误: 无法识别股票代码格式: {stock_code}[/red]")
-            console.print("\n[yellow]💡 支持的格式:[/yellow]")
-            console.print("  • sz.000001 (深交所完整格式)")
-            console.print("  • sh.600000 (上交所完整格式)")
-            console.print("  • 000001   (深交所简写，0或3开头)")
-            console.print("  • 600000   (上交所简写，6开头)")
-            return None
-    
-    return stock_code
+    formatted_code = normalize_stock_code(stock_code)
+    if formatted_code:
+        return formatted_code
+    
+    console.print(f"[red]❌ 错误: 无法识别股票代码格式: {stock_code.strip().lower()}[/red]")
+    console.print("\n[yellow]💡 支持的格式:[/yellow]")
+    console.print("  • sz.000001 (深交所完整格式)")
+    console.print("  • sh.600000 (上交所完整格式)")
+    console.print("  • 000001   (深交所简写，0/2/3开头)")
+    console.print("  • 600000   (上交所简写，6/9开头)")
+    return None
+
+def format_stock_codes(stock_codes):
+    """批量格式化股票代码，跳过无法识别的代码并按原顺序去重"""
+    return list(dict.fromkeys(code for code in map(format_stock_code, stock_codes) if code))
+
+def parse_float(text):
+    """将baostock返回的字符串解析为浮点数，空值或非法值返回NaN"""
+    try:
+        return float(text)
+    except ValueError:
+        return float('nan')
+
+def parse_float_column(values):
+    """将一列字符串批量解析为float64数组，含空值或非法值时逐个解析（对应位置为NaN）"""
+    import numpy as np
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        return np.array([parse_float(value) for value in values], dtype=np.float64)
+
+def iter_result_pages(rs):
+    """按页读取baostock结果集，每次返回当前页剩余的行
+
+    翻页方式与 rs.get_data() 相同（整页取 rs.data，再把 cur_row_num 移到页尾），
+    但不逐行调用 get_row_data()，也不依赖 pandas 2 已移除的 DataFrame.append。
+    """
+    while rs.error_code == '0' and rs.next():
+        page = rs.data[rs.cur_row_num:]
+        rs.cur_row_num = len(rs.data)
+        yield page
+
+def pages_to_columns(fields, pages, numeric_columns, capacity=256):
+    """将已读取的结果页（见 iter_result_pages）写入预分配的按列NumPy数组
+
+    数值列解析为float64（空值为NaN），其余列保存为object数组；
+    容量不足时按倍数扩容，返回 {字段: 数组} 形式的列字典。
+    """
+    import numpy as np
+    numeric_idx = [i for i, field in enumerate(fields) if field in numeric_columns]
+    text_idx = [i for i, field in enumerate(fields) if field not in numeric_columns]
+    arrays = [np.empty(capacity, dtype=np.float64 if field in numeric_columns else object) for field in fields]
+    size = 0
+    for page in pages:
+        count = len(page)
+        if size + count > capacity:
+            while size + count > capacity:
+                capacity *= 2
+            for i, array in enumerate(arrays):
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:size] = array[:size]
+                arrays[i] = grown
+        # 整页转置为按列的元组后批量写入
+        page_columns = list(zip(*page))
+        for i in numeric_idx:
+            arrays[i][size:size + count] = parse_float_column(page_columns[i])
+        for i in text_idx:
+            arrays[i][size:size + count] = page_columns[i]
+        size += count
+    return {field: array[:size] for field, array in zip(fields, arrays)}
+
+def open_export_file(path):
+    """打开导出文件，路径以 .gz 结尾时使用gzip压缩（低压缩级别，减少写盘量）"""
+    if path.endswith('.gz'):
+        import gzip
+        return gzip.open(path, 'wt', encoding='utf-8-sig', compresslevel=1, newline='')
+    return open(path, 'w', encoding='utf-8-sig', newline='')
+
+def export_columns_csv(columns, path):
+    """将按列数组直接写入CSV（带BOM，便于Excel打开），不经过DataFrame"""
+    import numpy as np
+    cells = []
+    for name, values in columns.items():
+        if values.dtype == np.float64:
+            # 数值列批量转字符串，缺失值留空，成交量保持整数
+            missing = np.isnan(values)
+            filled = np.where(missing, 0, values)
+            text = (filled.round().astype(np.int64) if name == 'volume' else filled).astype(str)
+            values = np.where(missing, '', text)
+        cells.append(values)
+    with open_export_file(path) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns.keys())
+        writer.writerows(zip(*cells))
+
+def estimate_kline_rows(start, end, frequency):
+    """根据日期范围和K线周期估算数据行数，用于预分配数组"""
+    try:
+        days = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    except ValueError:
+        return 256
+    return max(int(days * KLINE_SPECS[frequency].bars_per_day) + 1, 16)
+
+def format_price_column(values):
+    """批量格式化价格列，缺失值显示为'-'"""
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), '-', np.frompyfunc('{:.2f}'.format, 1, 1)(values))
+
+def format_volume_column(values):
+    """批量格式化成交量列，缺失或为0时显示为'-'"""
+    import numpy as np
+    volumes = np.asarray(values, dtype=np.float64)
+    volumes = np.where(np.isnan(volumes), 0, volumes).astype(np.int64)
+    return np.where(volumes > 0, np.frompyfunc('{:,}'.format, 1, 1)(volumes), '-')
+
+# 金额单位换算
+_YI = 100000000
+_WAN = 10000
+
+def format_amount(value_str):
+    """格式化财务金额显示，按亿/万自动换算单位，空值显示为'-'"""
+    if value_str in ('', None, 'None'):
+        return '-'
+    try:
+        value = float(value_str)
+    except (TypeError, ValueError):
+        return value_str
+    if abs(value) >= _YI:
+        return f"{value / _YI:.2f}亿"
+    if abs(value) >= _WAN:
+        return f"{value / _WAN:.2f}万"
+    return f"{value:.0f}"
+
+def format_amount_column(values):
+    """批量格式化成交额列，按亿/万自动换算单位"""
+    import numpy as np
+    amounts = np.asarray(values, dtype=np.float64)
+    amounts = np.where(np.isnan(amounts), 0, amounts)
+    conditions = [amounts > _YI, amounts > _WAN]
+    scaled = np.select(conditions, [amounts / _YI, amounts / _WAN], amounts)
+    units = np.select(conditions, ['亿', '万'], '')
+    return np.where(units == '', np.frompyfunc('{:.0f}'.format, 1, 1)(scaled),
+                    np.frompyfunc('{:.2f}'.format, 1, 1)(scaled) + units)
+
+def format_pct_column(values):
+    """批量格式化涨跌幅列，上涨红色、下跌绿色
+
+    直接生成带样式的Text对象，避免Rich逐行解析markup。
+    """
+    import numpy as np
+    from rich.text import Text
+    pct = np.asarray(values, dtype=np.float64)
+    pct = np.where(np.isnan(pct), 0, pct)
+    styles = np.select([pct > 0, pct < 0], ['red', 'green'], 'white')
+    texts = np.where(pct != 0, np.frompyfunc('{:+.2f}%'.format, 1, 1)(pct), '0.00%')
+    return [Text(str(text), style=str(style)) for text, style in zip(texts, styles)]
+
+# 统计面板: 类型 -> (标题, 边框颜色)
+_PANEL_STYLES = {
+    'trading': ("📈", "blue"),
+    'trend': ("📊", "red"),
+    'price': ("💰", "yellow"),
+    'investment': ("💰", "cyan"),
+    'volume': ("📊", "magenta"),
+    'index': ("📊", "blue"),
+    'distribution': ("🏢", "green"),
+}
+
+def stats_panel(text, kind):
+    """按 _PANEL_STYLES 中的样式创建统计面板"""
+    from rich.panel import Panel
+    title, border_style = _PANEL_STYLES[kind]
+    return Panel(text, title=title, border_style=border_style, padding=(0, 1))
 
 def display_kline_stats(df, frequency='d'):
-    """显示K线统计信息"""
-    total_days = len(df)
-    
-    # 检查是否存在 pctChg 字段，如果不存在，则计算涨跌幅
-    if 'pctChg' not in df.columns:
-        # 对于周线/月线数据，需要手动计算涨跌幅
-        df['pctChg'] = df['close'].astype(float).pct_change() * 100
+    """显示K线统计信息（df 可以是DataFrame，也可以是按列的数组字典）"""
+    import numpy as np
+    from rich.console import Group
+    from rich.columns import Columns
+    from rich.text import Text
+    total_days = len(df['close'])
+    
+    # 各列只转换一次为float64数组，后续统计都在数组上完成
+    prices = np.asarray(df['close'], dtype=np.float64)
+    volumes = np.asarray(df['volume'], dtype=np.float64)
+    
+    # 检查是否存在 pctChg 字段，如果不存在，则由收盘价计算涨跌幅
+    if 'pctChg' in df:
+        pct = np.asarray(df['pctChg'], dtype=np.float64)
+    else:
+        # 对于分钟线/周线/月线数据，需要手动计算涨跌幅
+        pct = np.empty_like(prices)
         # 第一行的涨跌幅无法计算，设为0
-        df['pctChg'] = df['pctChg'].fillna(0)
-    
-    up_days = len(df[df['pctChg'].astype(float) > 0])
-    down_days = len(df[df['pctChg'].astype(float) < 0])
+        pct[:1] = 0.0
+        # 收盘价为0时结果为inf/NaN，与原 pct_change 一致，不输出除零警告
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct[1:] = (prices[1:] / prices[:-1] - 1.0) * 100.0
+        df['pctChg'] = pct
+    
+    up_days = int(np.count_nonzero(pct > 0))
+    down_days = int(np.count_nonzero(pct < 0))
     flat_days = total_days - up_days - down_days
     
     # 计算价格统计
-    prices = df['close'].astype(float)
-    price_change = prices.iloc[-1] - prices.iloc[0] if len(prices) > 1 else 0
-    price_change_pct = (price_change / prices.iloc[0] * 100) if len(prices) > 1 and prices.iloc[0] != 0 else 0
+    price_change = prices[-1] - prices[0] if len(prices) > 1 else 0
+    price_change_pct = (price_change / prices[0] * 100) if len(prices) > 1 and prices[0] != 0 else 0
     
     # 根据频率设置交易周期描述
     period_desc = {
@@ -993,8 +1301,8 @@ def display_kline_stats(df, frequency='d'):
     # 对于分钟级别的K线，计算实际的交易天数
     if frequency in ['5m', '15m', '30m', '60m']:
         # 提取日期部分（不含时间）
-        if 'date' in df.columns:
-            unique_days = df['date'].nunique()
+        if 'date' in df:
+            unique_days = len(set(df['date']))
             trading_days_text = f"总交易日: {unique_days} 天 ({total_days} 个{frequency}周期)"
         else:
             trading_days_text = f"总交易日: {total_days} 个{frequency}周期"
@@ -1008,59 +1316,16 @@ def display_kline_stats(df, frequency='d'):
         elif frequency == 'M':
             trading_days_text += " 月"
     
-    # 交易日统计
-    trading_stats = Text()
-    trading_stats.append("📊 ", style="bold blue")
-    trading_stats.append("交易统计", style="bold white")
-    trading_stats.append(f"\n{trading_days_text}", style="white")
-    
-    # 涨跌统计
-    trend_stats = Text()
-    trend_stats.append("📈 ", style="bold red")
-    trend_stats.append("涨跌分布", style="bold white")
-    trend_stats.append(f"\n上涨: ", style="white")
-    trend_stats.append(f"{up_days}", style="bold red")
-    trend_stats.append(f" ({up_days/total_days*100:.1f}%)", style="red")
-    trend_stats.append(f"\n下跌: ", style="white")
-    trend_stats.append(f"{down_days}", style="bold green")
-    trend_stats.append(f" ({down_days/total_days*100:.1f}%)", style="green")
-    if flat_days > 0:
-        trend_stats.append(f"\n平盘: ", style="white")
-        trend_stats.append(f"{flat_days}", style="bold yellow")
-        trend_stats.append(f" ({flat_days/total_days*100:.1f}%)", style="yellow")
+    # 成交量统计：缺失值只过滤一次，均值和最大值共用
+    valid_volumes = volumes[~np.isnan(volumes)]
+    avg_volume = valid_volumes.mean() if len(valid_volumes) > 0 else 0
+    max_volume = valid_volumes.max() if len(valid_volumes) > 0 else 0
     
-    # 价格变化统计
-    price_stats = Text()
-    price_stats.append("💰 ", style="bold yellow")
-    price_stats.append("价格变化", style="bold white")
-    if len(prices) > 1:
-        price_color = "red" if price_change > 0 else "green" if price_change < 0 else "white"
-        price_stats.append(f"\n期间涨跌: ", style="white")
-        price_stats.append(f"{price_change:+.2f}", style=f"bold {price_color}")
-        price_stats.append(f" ({price_change_pct:+.2f}%)", style=price_color)
-        price_stats.append(f"\n起始价格: ", style="white")
-        price_stats.append(f"{prices.iloc[0]:.2f}", style="cyan")
-        price_stats.append(f"\n结束价格: ", style="white")
-        price_stats.append(f"{prices.iloc[-1]:.2f}", style="cyan")
-    
-    # 成交量统计
-    volumes = df['volume'].astype(float)
-    avg_volume = volumes.mean() if len(volumes) > 0 else 0
-    max_volume = volumes.max() if len(volumes) > 0 else 0
-        
-    volume_stats = Text()
-    volume_stats.append("📊 ", style="bold magenta")
-    volume_stats.append("成交统计", style="bold white")
-    volume_stats.append(f"\n平均成交量: ", style="white")
-    volume_stats.append(f"{int(avg_volume):,}", style="bold blue")
-    volume_stats.append(f"\n最大成交量: ", style="white")
-    volume_stats.append(f"{int(max_volume):,}", style="bold blue")
-
     # 投资收益模拟
     investment_amount = 10000  # 假设投资1万元
-    if len(prices) > 1 and prices.iloc[0] != 0:
-        shares_bought = investment_amount / prices.iloc[0]  # 能买多少股
-        final_value = shares_bought * prices.iloc[-1]  # 最终价值
+    if len(prices) > 1 and prices[0] != 0:
+        shares_bought = investment_amount / prices[0]  # 能买多少股
+        final_value = shares_bought * prices[-1]  # 最终价值
         profit_loss = final_value - investment_amount  # 盈亏
         profit_loss_pct = (profit_loss / investment_amount) * 100  # 盈亏百分比
     else:
@@ -1068,47 +1333,91 @@ def display_kline_stats(df, frequency='d'):
         final_value = investment_amount
         profit_loss = 0
         profit_loss_pct = 0
-        
-    investment_stats = Text()
-    investment_stats.append("💰 ", style="bold cyan")
-    investment_stats.append("投资模拟", style="bold white")
-    investment_stats.append(f"\n投入本金: ", style="white")
-    investment_stats.append(f"¥{investment_amount:,.0f}", style="bold cyan")
+    
+    if use_plain_output():
+        # 纯文本输出，每类统计一行
+        lines = [
+            f"\n交易统计: {trading_days_text}",
+            f"涨跌分布: 上涨 {up_days} ({up_days/total_days*100:.1f}%)  下跌 {down_days} ({down_days/total_days*100:.1f}%)"
+            + (f"  平盘 {flat_days} ({flat_days/total_days*100:.1f}%)" if flat_days > 0 else ""),
+        ]
+        if len(prices) > 1:
+            lines.append(f"价格变化: 期间涨跌 {price_change:+.2f} ({price_change_pct:+.2f}%)  "
+                         f"起始价格 {prices[0]:.2f}  结束价格 {prices[-1]:.2f}")
+            lines.append(f"投资模拟: 投入本金 ¥{investment_amount:,.0f}  购买股数 {shares_bought:.0f}股  "
+                         f"最终价值 ¥{final_value:,.2f}  盈亏 {profit_loss:+,.2f} ({profit_loss_pct:+.2f}%)")
+        else:
+            lines.append(f"投资模拟: 投入本金 ¥{investment_amount:,.0f}")
+        lines.append(f"成交统计: 平均成交量 {int(avg_volume):,}  最大成交量 {int(max_volume):,}")
+        print("\n".join(lines))
+        return
+    
+    # 交易日统计
+    trading_stats = Text.from_markup(f"[bold blue]📊 [/][bold white]交易统计[/][white]\n{trading_days_text}[/]")
+    
+    # 涨跌统计
+    trend_markup = (
+        "[bold red]📈 [/][bold white]涨跌分布[/]"
+        f"[white]\n上涨: [/][bold red]{up_days}[/][red] ({up_days/total_days*100:.1f}%)[/]"
+        f"[white]\n下跌: [/][bold green]{down_days}[/][green] ({down_days/total_days*100:.1f}%)[/]"
+    )
+    if flat_days > 0:
+        trend_markup += f"[white]\n平盘: [/][bold yellow]{flat_days}[/][yellow] ({flat_days/total_days*100:.1f}%)[/]"
+    trend_stats = Text.from_markup(trend_markup)
+    
+    # 价格变化统计
+    price_markup = "[bold yellow]💰 [/][bold white]价格变化[/]"
+    if len(prices) > 1:
+        price_color = "red" if price_change > 0 else "green" if price_change < 0 else "white"
+        price_markup += (
+            f"[white]\n期间涨跌: [/][bold {price_color}]{price_change:+.2f}[/][{price_color}] ({price_change_pct:+.2f}%)[/]"
+            f"[white]\n起始价格: [/][cyan]{prices[0]:.2f}[/]"
+            f"[white]\n结束价格: [/][cyan]{prices[-1]:.2f}[/]"
+        )
+    price_stats = Text.from_markup(price_markup)
+    
+    volume_stats = Text.from_markup(
+        "[bold magenta]📊 [/][bold white]成交统计[/]"
+        f"[white]\n平均成交量: [/][bold blue]{int(avg_volume):,}[/]"
+        f"[white]\n最大成交量: [/][bold blue]{int(max_volume):,}[/]"
+    )
+
+    investment_markup = f"[bold cyan]💰 [/][bold white]投资模拟[/][white]\n投入本金: [/][bold cyan]¥{investment_amount:,.0f}[/]"
     if len(prices) > 1:
-        investment_stats.append(f"\n购买股数: ", style="white")
-        investment_stats.append(f"{shares_bought:.0f}", style="cyan")
-        investment_stats.append("股", style="white")
-        investment_stats.append(f"\n最终价值: ", style="white")
-        investment_stats.append(f"¥{final_value:,.2f}", style="bold cyan")
-            
         profit_color = "red" if profit_loss > 0 else "green" if profit_loss < 0 else "white"
         profit_symbol = "📈" if profit_loss > 0 else "📉" if profit_loss < 0 else "➖"
-        investment_stats.append(f"\n{profit_symbol} ", style=profit_color)
+        investment_markup += (
+            f"[white]\n购买股数: [/][cyan]{shares_bought:.0f}[/][white]股[/]"
+            f"[white]\n最终价值: [/][bold cyan]¥{final_value:,.2f}[/]"
+            f"[{profit_color}]\n{profit_symbol} [/]"
+        )
         if profit_loss > 0:
-            investment_stats.append("盈利: ", style="white")
-            investment_stats.append(f"+¥{profit_loss:,.2f}", style=f"bold {profit_color}")
+            investment_markup += f"[white]盈利: [/][bold {profit_color}]+¥{profit_loss:,.2f}[/]"
         elif profit_loss < 0:
-            investment_stats.append("亏损: ", style="white")
-            investment_stats.append(f"¥{profit_loss:,.2f}", style=f"bold {profit_color}")
+            investment_markup += f"[white]亏损: [/][bold {profit_color}]¥{profit_loss:,.2f}[/]"
         else:
-            investment_stats.append("持平", style="white")
-        investment_stats.append(f" ({profit_loss_pct:+.2f}%)", style=profit_color)
+            investment_markup += "[white]持平[/]"
+        investment_markup += f"[{profit_color}] ({profit_loss_pct:+.2f}%)[/]"
+    investment_stats = Text.from_markup(investment_markup)
 
     # 创建列布局 - 分两行显示
     top_panels = [
-        Panel(trading_stats, title="📈", border_style="blue", padding=(0, 1)),
-        Panel(trend_stats, title="📊", border_style="red", padding=(0, 1)),
-        Panel(price_stats, title="💰", border_style="yellow", padding=(0, 1))
+        stats_panel(trading_stats, 'trading'),
+        stats_panel(trend_stats, 'trend'),
+        stats_panel(price_stats, 'price'),
     ]
         
     bottom_panels = [
-        Panel(investment_stats, title="💰", border_style="cyan", padding=(0, 1)),
-        Panel(volume_stats, title="📊", border_style="magenta", padding=(0, 1))
+        stats_panel(investment_stats, 'investment'),
+        stats_panel(volume_stats, 'volume'),
     ]
         
-    console.print("\n")
-    console.print(Columns(top_panels, equal=False, expand=False, align="left"))
-    console.print(Columns(bottom_panels, equal=False, expand=False, align="left"))
+    # 两行面板合并为一次输出
+    console.print(Group(
+        "\n",
+        Columns(top_panels, equal=False, expand=False, align="left"),
+        Columns(bottom_panels, equal=False, expand=False, align="left"),
+    ))
 
 @cli.command()
 @click.option('--index', '-i', type=click.Choice(['sz50', 'hs300', 'zz500']), required=True, help='指数类型')
@@ -1213,6 +1522,7 @@ def index(index, export):
     • 投资参考: 成分股列表可作为投资组合参考
     • 权重信息: 当前版本不包含权重数据，仅提供成分股列表
     """
+    import baostock as bs
     
     # 指数代码映射
     index_codes = {
@@ -1229,143 +1539,161 @@ def index(index, export):
     
     console.print(f"[blue]📊 正在获取 {index_names[index]} 成分股数据...[/blue]")
     
-    # 登录baostock系统
-    lg = bs.login()
-    if lg.error_code != '0':
-        console.print(f"[red]baostock登录失败: {lg.error_msg}[/red]")
-        return
-    
-    try:
+    # 当天的成分股列表优先从本地缓存读取
+    query_date = date.today().isoformat()
+    cache_file = cache_path('index', index, query_date)
+    cached = load_cache(cache_file)
+    if cached is None:
+        # 复用当前进程的baostock会话
+        if not ensure_login():
+            return
+        
         # 获取指数成分股
-        if index == 'sz50':
-            rs = bs.query_sz50_stocks(date=datetime.now().strftime('%Y-%m-%d'))
-        elif index == 'hs300':
-            rs = bs.query_hs300_stocks(date=datetime.now().strftime('%Y-%m-%d'))
-        elif index == 'zz500':
-            rs = bs.query_zz500_stocks(date=datetime.now().strftime('%Y-%m-%d'))
+        index_queries = {
+            'sz50': bs.query_sz50_stocks,
+            'hs300': bs.query_hs300_stocks,
+            'zz500': bs.query_zz500_stocks,
+        }
+        rs = index_queries[index](date=query_date)
         
         if rs.error_code != '0':
             console.print(f"[red]成分股数据获取失败: {rs.error_msg}[/red]")
             return
         
-        # 将数据转换为DataFrame
-        data_list = []
-        while (rs.error_code == '0') & rs.next():
-            data_list.append(rs.get_row_data())
-        
-        if not data_list:
-            console.print(f"[yellow]未找到 {index_names[index]} 的成分股数据[/yellow]")
-            return
-        
-        df = pd.DataFrame(data_list, columns=rs.fields)
-        
-        # 创建Rich表格
-        table = Table(
-            title=f"📊 {index_names[index]} 成分股列表 (共{len(df)}只)",
-            box=box.ROUNDED,
-            expand=True,
-            show_header=True,
-            header_style="bold magenta",
-            row_styles=["", "on grey11"],
-            padding=(1, 1),
+        data_list = [row for page in iter_result_pages(rs) for row in page]
+        cached = (rs.fields, data_list)
+        if data_list:
+            save_cache(cache_file, cached)
+    
+    fields, data_list = cached
+    if not data_list:
+        console.print(f"[yellow]未找到 {index_names[index]} 的成分股数据[/yellow]")
+        return
+    
+    # 字段位置只计算一次，直接遍历原始行，无需构造DataFrame
+    code_idx = fields.index('code')
+    name_idx = fields.index('code_name') if 'code_name' in fields else None
+    date_idx = fields.index('updateDate') if 'updateDate' in fields else None
+    
+    # 创建Rich表格
+    table = make_index_table(f"📊 {index_names[index]} 成分股列表 (共{len(data_list)}只)")
+    
+    # 添加数据行
+    for idx, row in enumerate(data_list, 1):
+        table.add_row(
+            str(idx),
+            row[code_idx],
+            row[name_idx] if name_idx is not None else '-',
+            row[date_idx] if date_idx is not None else '-',
         )
-        
-        # 添加列
-        table.add_column("序号", style="cyan", justify="center", width=6)
-        table.add_column("股票代码", style="yellow", justify="center", width=12)
-        table.add_column("股票名称", style="white", justify="left", width=15)
-        table.add_column("更新日期", style="blue", justify="center", width=12)
-        
-        # 添加数据行
-        for idx, (_, row) in enumerate(df.iterrows(), 1):
-            table.add_row(
-                str(idx),
-                row['code'],
-                row['code_name'] if 'code_name' in row else '-',
-                row['updateDate'] if 'updateDate' in row else '-'
-            )
-        
-        console.print(table)
-        
-        # 显示统计信息
-        display_index_stats(index_names[index], index_codes[index], df)
-        
-        # 导出数据
-        if export:
-            df.to_csv(export, index=False, encoding='utf-8-sig')
-            console.print(f"\n[green]✅ 数据已导出到: {export}[/green]")
-    
-    finally:
-        # 登出baostock系统
-        bs.logout()
-
-def display_index_stats(index_name, index_code, df):
-    """显示指数统计信息"""
-    stats_text = Text()
-    stats_text.append("📈 ", style="bold blue")
-    stats_text.append("指数信息", style="bold white")
-    stats_text.append(f"\n指数名称: ", style="white")
-    stats_text.append(f"{index_name}", style="bold cyan")
-    stats_text.append(f"\n指数代码: ", style="white")
-    stats_text.append(f"{index_code}", style="bold yellow")
-    stats_text.append(f"\n成分股数: ", style="white")
-    stats_text.append(f"{len(df)}", style="bold green")
-    stats_text.append(" 只", style="white")
-    
-    # 统计交易所分布
-    sz_count = len([code for code in df['code'] if code.startswith('sz.')])
-    sh_count = len([code for code in df['code'] if code.startswith('sh.')])
-    
-    distribution_text = Text()
-    distribution_text.append("🏢 ", style="bold green")
-    distribution_text.append("交易所分布", style="bold white")
-    distribution_text.append(f"\n上交所: ", style="white")
-    distribution_text.append(f"{sh_count}", style="bold red")
-    distribution_text.append(" 只", style="white")
-    distribution_text.append(f"\n深交所: ", style="white")
-    distribution_text.append(f"{sz_count}", style="bold blue")
-    distribution_text.append(" 只", style="white")
+    
+    console.print(table)
+    
+    # 显示统计信息
+    display_index_stats(index_names[index], index_codes[index], [row[code_idx] for row in data_list])
+    
+    # 导出数据（原始行直接写入CSV，不经过DataFrame）
+    if export:
+        with open_export_file(export) as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(fields)
+            writer.writerows(data_list)
+        console.print(f"\n[green]✅ 数据已导出到: {export}[/green]")
+
+# 成分股表格的列定义: (列标题, 样式, 对齐方式, 宽度)
+_INDEX_TABLE_COLUMNS = (
+    ("序号", "cyan", "center", 6),
+    ("股票代码", "yellow", "center", 12),
+    ("股票名称", "white", "left", 15),
+    ("更新日期", "blue", "center", 12),
+)
+
+def make_index_table(title):
+    """创建成分股列表表格（序号、代码、名称、更新日期）"""
+    from rich.table import Table
+    from rich import box
+    table = Table(
+        title=title,
+        box=box.ROUNDED,
+        expand=True,
+        show_header=True,
+        header_style="bold magenta",
+        row_styles=["", "on grey11"],
+        padding=(1, 1),
+    )
+    for header, style, justify, width in _INDEX_TABLE_COLUMNS:
+        table.add_column(header, style=style, justify=justify, width=width)
+    return table
+
+def display_index_stats(index_name, index_code, codes):
+    """显示指数统计信息（codes 为成分股代码列表）"""
+    from collections import Counter
+    # 统计交易所分布（一次遍历按代码前缀计数）
+    prefix_counts = Counter(code[:3] for code in codes)
+    sz_count = prefix_counts['sz.']
+    sh_count = prefix_counts['sh.']
+    
+    if use_plain_output():
+        print(f"\n指数信息: {index_name} ({index_code})  成分股数 {len(codes)} 只")
+        print(f"交易所分布: 上交所 {sh_count} 只  深交所 {sz_count} 只")
+        return
+    
+    from rich.columns import Columns
+    from rich.text import Text
+    stats_text = Text.from_markup(
+        "[bold blue]📈 [/][bold white]指数信息[/]"
+        f"[white]\n指数名称: [/][bold cyan]{index_name}[/]"
+        f"[white]\n指数代码: [/][bold yellow]{index_code}[/]"
+        f"[white]\n成分股数: [/][bold green]{len(codes)}[/][white] 只[/]"
+    )
+    
+    distribution_text = Text.from_markup(
+        "[bold green]🏢 [/][bold white]交易所分布[/]"
+        f"[white]\n上交所: [/][bold red]{sh_count}[/][white] 只[/]"
+        f"[white]\n深交所: [/][bold blue]{sz_count}[/][white] 只[/]"
+    )
     
     panels = [
-        Panel(stats_text, title="📊", border_style="blue", padding=(0, 1)),
-        Panel(distribution_text, title="🏢", border_style="green", padding=(0, 1))
+        stats_panel(stats_text, 'index'),
+        stats_panel(distribution_text, 'distribution'),
     ]
     
     console.print("\n")
     console.print(Columns(panels, equal=True, expand=False, align="left"))
 
+# 股票链接面板的markup模板，只需填入三个链接
+_STOCK_LINK_TEMPLATE = (
+    "[bold blue]🔗 [/][white]百度股市通: [/][bold cyan underline]{baidu}[/]\n"
+    "[bold green]📈 [/][white]东方财富 : [/][bold green underline]{eastmoney}[/]\n"
+    "[bold yellow]🔍 [/][white]百度搜索 : [/][bold yellow underline]{search}[/]"
+)
+
 def display_stock_link(stock_code):
     """显示股票链接"""
+    from rich.console import Group
+    from rich.panel import Panel
+    from rich.text import Text
+    
     # 提取纯股票代码（去掉sz.或sh.前缀）
     clean_code = stock_code.replace('sz.', '').replace('sh.', '')
     
     # 生成完整股票代码（保留交易所前缀，转换为大写）
     full_code = stock_code.upper().replace('.', '')  # sz.000001 -> SZ000001
     
-    # 百度股市通链接
-    baidu_link = f"https://gushitong.baidu.com/stock/ab-{clean_code}"
-    
-    # 东方财富链接
-    eastmoney_link = f"https://quote.eastmoney.com/concept/{full_code}.html?from=data"
-    
-    # 百度搜索链接
-    baidu_search_link = f"https://www.baidu.com/s?wd={clean_code}"
+    links = dict(
+        baidu=f"https://gushitong.baidu.com/stock/ab-{clean_code}",
+        eastmoney=f"https://quote.eastmoney.com/concept/{full_code}.html?from=data",
+        search=f"https://www.baidu.com/s?wd={clean_code}",
+    )
+    if use_plain_output():
+        print(f"\n百度股市通: {links['baidu']}\n东方财富 : {links['eastmoney']}\n百度搜索 : {links['search']}")
+        return
     
-    # 创建可点击的链接
-    link_text = Text()
-    link_text.append("🔗 ", style="bold blue")
-    link_text.append("百度股市通: ", style="white")
-    link_text.append(baidu_link, style="bold cyan underline")
-    link_text.append("\n📈 ", style="bold green")
-    link_text.append("东方财富 : ", style="white")
-    link_text.append(eastmoney_link, style="bold green underline")
-    link_text.append("\n🔍 ", style="bold yellow")
-    link_text.append("百度搜索 : ", style="white")
-    link_text.append(baidu_search_link, style="bold yellow underline")
+    # 创建可点击的链接：百度股市通、东方财富、百度搜索
+    link_text = Text.from_markup(_STOCK_LINK_TEMPLATE.format(**links))
     
     panel = Panel(link_text, title="📊 查看更多", border_style="cyan", padding=(0, 1),width=100)
-    console.print("\n")
-    console.print(panel)
+    console.print(Group("\n", panel))
 
 
 @cli.command()
@@ -1420,46 +1748,29 @@ def batch(config, days):
         console.print(f"[red]配置文件 {config_path} 中没有有效的股票代码[/red]")
         return
     console.print(f"[blue]批量统计，读取配置文件: {config_path}[/blue]")
-    for code in codes:
-        stock_code = format_stock_code(code)
-        if not stock_code:
-            continue
-        # 获取最近N天K线数据
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
-        start = start_date.strftime('%Y-%m-%d')
-        end = end_date.strftime('%Y-%m-%d')
-        lg = bs.login()
-        if lg.error_code != '0':
-            console.print(f"[red]baostock登录失败: {lg.error_msg}[/red]")
-            continue
-        try:
-            rs = bs.query_history_k_data_plus(
-                stock_code,
-                "date,code,open,high,low,close,preclose,volume,amount,adjustflag,turn,tradestatus,pctChg,isST",
-                start_date=start,
-                end_date=end,
-                frequency="d",
-                adjustflag="3"
-            )
-            if rs.error_code != '0':
-                console.print(f"[red]{stock_code} 数据获取失败: {rs.error_msg}[/red]")
+    stock_codes = format_stock_codes(codes)
+    if not stock_codes:
+        return
+    # 获取最近N天K线数据
+    end_date = date.today()
+    start = (end_date - timedelta(days=days)).isoformat()
+    end = end_date.isoformat()
+    # 多线程并发拉取（缓存未命中时才登录，所有股票共用一次登录），统计结果在主线程按配置顺序输出
+    with ThreadPoolExecutor(max_workers=min(16, len(stock_codes))) as executor:
+        results = executor.map(lambda stock_code: fetch_kline(stock_code, start, end, 'd'), stock_codes)
+        for stock_code, (columns, error_msg) in zip(stock_codes, results):
+            if columns is None:
+                if not error_msg:
+                    # 登录失败，错误已输出
+                    return
+                console.print(f"[red]{stock_code} 数据获取失败: {error_msg}[/red]")
                 continue
-            data_list = []
-            while (rs.error_code == '0') & rs.next():
-                data_list.append(rs.get_row_data())
-            if not data_list:
+            if len(columns['date']) == 0:
                 console.print(f"[yellow]未找到 {stock_code} 在指定日期范围内的数据[/yellow]")
                 continue
-            df = pd.DataFrame(data_list, columns=rs.fields)
-            numeric_columns = ['open', 'high', 'low', 'close', 'preclose', 'volume', 'amount', 'turn', 'pctChg']
-            for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
             # 只输出统计信息
             console.print(f"\n[bold green]统计: {stock_code}[/bold green]")
-            display_kline_stats(df)
-        finally:
-            bs.logout()
+            display_kline_stats(columns)
 
 if __name__ == '__main__':
     cli()